@@ -1,66 +1,248 @@
 import asyncio
-import json
+import hashlib
+import heapq
 import os
-import shutil
 import websockets
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
-import subprocess
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional, Tuple
 from aiohttp import web
 import argparse
 import sys
 import logging
+import logging.handlers
+import queue
 import time
 import signal
 import aiohttp
 import re
+import random
+from dataclasses import dataclass
+import orjson
+from urllib.parse import quote
+
+try:
+    # Optional libuv based event loop, used when installed
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Delay before dirty settings are written back to disk, coalescing bursts of updates
+SETTINGS_FLUSH_DELAY = 0.25
+
+# RTSP transport variants (UDP, TCP, HTTP tunnelled) that GStreamer should open as plain rtsp://
+_RTSP_VARIANT_RE = re.compile(r'rtsp[uth]://')
+
+# Characters that are unsafe in filenames: / \ : * ? " < > | and whitespace
+_UNSAFE_CHARS_RE = re.compile(r'[\\/*?:"<>|\s]')
+
+# Invariant part of the recording pipeline between rtspsrc and the mode specific elements
+GST_QUEUE_ELEMENTS = (
+    "!",
+    "queue",
+    "max-size-buffers=200",  # Larger buffer for H.265
+    "max-size-time=2000000000",  # 2 second buffer for H.265
+    "max-size-bytes=20000000",  # 20MB buffer for H.265
+)
+
+# Elements for each recording mode, each ending in a parsed stream for splitmuxsink
+GST_MODE_ELEMENTS = {
+    # Store the camera's own H.264/H.265 stream as-is, no decode or encode at all
+    "passthrough": (
+        "!",
+        "parsebin"  # Depayload and parse whichever codec the stream carries
+    ),
+    # Re-encode on the Raspberry Pi hardware encoder
+    "v4l2": (
+        "!",
+        "decodebin",  # Auto-detect and decode H.264/H.265 streams
+        "!",
+        "videoconvert",
+        "!",
+        "v4l2h264enc",
+        "extra-controls=controls,video_bitrate=2000000",
+        "!",
+        "video/x-h264,level=(string)4",  # The Pi encoder needs an explicit level to negotiate
+        "!",
+        "h264parse"
+    ),
+    # Handles both H.264 and H.265 streams, decodebin automatically picks the right decoder
+    "x264": (
+        "!",
+        "decodebin",  # Auto-detect and decode H.264/H.265 streams
+        "!",
+        "videoconvert",  # Ensure proper color space conversion
+        "!",
+        "videoscale",  # Handle resolution changes
+        "!",
+        "x264enc",  # Use software encoder for ARM compatibility
+        "bitrate=2000",  # Set reasonable bitrate for ARM
+        "speed-preset=ultrafast",  # Optimize for ARM performance
+        "!",
+        "h264parse"  # Parse encoded H.264
+    ),
+}
+
+# Software encoding works everywhere, so it stays the default
+DEFAULT_RECORDING_MODE = "x264"
+
+# How often, and for how long, new recordings are checked for a growing output file
+VERIFY_INTERVAL = 3.0
+VERIFY_TIMEOUT = 30.0
+
+# Upper bound in seconds for the websocket reconnect backoff
+WS_RECONNECT_MAX_DELAY = 30.0
+
+# Heartbeats waiting for processing; when full the oldest is dropped, only the latest state matters
+HEARTBEAT_QUEUE_SIZE = 64
+
+# How long the camera manager stream list is trusted before it is fetched again
+STREAMS_CACHE_TTL = 5.0
+
+# How long a disk usage reading is reused before querying the filesystem again
+DISK_USAGE_TTL = 1.0
+
+# How often the housekeeper checks free space and reclaims it while disarmed
+HOUSEKEEPING_INTERVAL = 1.0
+
+# How many videos one housekeeping pass may delete before giving up on reaching the minimum free space
+MAX_RECLAIM_DELETIONS = 10
+
+# General settings the API may not change, they come from the command line
+READ_ONLY_SETTINGS = frozenset({"log_folder", "video_folder"})
+
+# Shared read-only default for missing sub-objects, so lookups don't allocate a new {}
+_EMPTY = MappingProxyType({})
+
+# Autopilots whose heartbeats drive arming state
+VALID_AUTOPILOTS = frozenset({
+    "MAV_AUTOPILOT_GENERIC",
+    "MAV_AUTOPILOT_ARDUPILOTMEGA",
+    "MAV_AUTOPILOT_PX4"
+})
+
+# Vehicle types we record for (cameras, gimbals, etc. are ignored)
+VEHICLE_TYPES = frozenset({
+    "MAV_TYPE_FIXED_WING",
+    "MAV_TYPE_QUADROTOR",
+    "MAV_TYPE_HELICOPTER",
+    "MAV_TYPE_GROUND_ROVER",
+    "MAV_TYPE_SUBMARINE",
+    "MAV_TYPE_SURFACE_BOAT",
+    "MAV_TYPE_VTOL"
+})
+
+def json_response(data, status: int = 200) -> web.Response:
+    """Build a JSON response serialized with orjson"""
+    return web.Response(body=orjson.dumps(data), status=status, content_type='application/json')
+
+def json_body_response(body: bytes, status: int = 200) -> web.Response:
+    """Build a JSON response from an already serialized body"""
+    return web.Response(body=body, status=status, content_type='application/json')
+
+# Fixed settings API replies, serialized once since only the error message ever varies
+SETTINGS_UPDATED_BODY = orjson.dumps({"success": True, "message": "Settings updated successfully"})
+INVALID_JSON_BODY = orjson.dumps({"success": False, "message": "Invalid JSON data"})
+
+class DiskUsage(NamedTuple):
+    """Total and available bytes of a filesystem, as reported by statvfs"""
+    total: int
+    free: int
+
+# Accepted values for the general settings that are limited to a fixed set
+OUT_OF_SPACE_ACTIONS = frozenset({"stop", "delete_oldest_video"})
+
+def _is_number(value) -> bool:
+    # bool is an int subclass, but true/false is never a valid size
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def validate_settings_payload(data) -> Optional[str]:
+    """Check a settings update payload, returning a description of the first problem or None"""
+    if not isinstance(data, dict):
+        return "body must be a JSON object"
+
+    general = data.get("general")
+    if general is not None:
+        if not isinstance(general, dict):
+            return "general must be an object"
+        if "minimum_free_space_mb" in general and not (_is_number(general["minimum_free_space_mb"]) and general["minimum_free_space_mb"] >= 0):
+            return "minimum_free_space_mb must be a non-negative number"
+        if "segment_size" in general and not (_is_number(general["segment_size"]) and isinstance(general["segment_size"], int) and general["segment_size"] > 0):
+            return "segment_size must be a positive whole number of MB"
+        if "out_of_space_action" in general and general["out_of_space_action"] not in OUT_OF_SPACE_ACTIONS:
+            return f"unknown out_of_space_action: {general['out_of_space_action']}"
+        if "recording_mode" in general and general["recording_mode"] not in GST_MODE_ELEMENTS:
+            return f"unknown recording_mode: {general['recording_mode']}"
+
+    streams = data.get("streams")
+    if streams is not None:
+        if not isinstance(streams, list):
+            return "streams must be an array"
+        for stream in streams:
+            if not isinstance(stream, dict) or not isinstance(stream.get("name"), str):
+                return "each stream must be an object with a string name"
+            if not isinstance(stream.get("url"), str):
+                return f"stream {stream['name']}: url must be a string"
+            if "enabled" in stream and not isinstance(stream["enabled"], bool):
+                return f"stream {stream['name']}: enabled must be true or false"
+    return None
+
+@dataclass(frozen=True, slots=True)
+class DashcamConfig:
+    """Startup configuration from the command line, fixed for the life of the process"""
+    log_folder: str
+    video_folder: str
+    blueos_address: str
+    settings_path: str = "/home/blueos/settings/dashcam.json"
 
 class VideoRecorder:
-    def __init__(self, log_folder: str, video_folder: str, mavlink_url: str, settings_path: str = "/home/blueos/settings/dashcam.json"):
-        # Setup logging
-        # Create logs directory if it doesn't exist
-        log_dir = Path(video_folder).parent / "logs"
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / "dashcam.log"
-        
-        # Create file handler for logging to file
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        
-        # Create console handler for stdout
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        
-        # Configure root logger
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            force=True,
-            handlers=[file_handler, console_handler]
-        )
+    def __init__(self, config: DashcamConfig):
+        # Logging handlers are configured once in main()
         self.logger = logging.getLogger("dashcam")
         
-        self.settings_path = settings_path
+        self.config = config
         self.settings = self.load_settings()
-        self.settings["settings"]["log_folder"] = log_folder
-        self.settings["settings"]["video_folder"] = video_folder
-        self.logger.info(f"Settings path: {self.settings_path}")
-        self.logger.info(f"Settings: {self.settings}")
-        self.mavlink_url = mavlink_url
-        self.recording_processes: Dict[str, subprocess.Popen] = {}
+        self._settings_dirty = False
+        self._last_settings_bytes: Optional[bytes] = None  # Contents of the last write, to skip no-op saves
+        self._settings_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self.settings["settings"]["log_folder"] = config.log_folder
+        self.settings["settings"]["video_folder"] = config.video_folder
+        # The folders come from the command line and are read-only through the API, so build their Paths once
+        self._log_folder = Path(config.log_folder)
+        self._video_folder = Path(config.video_folder)
+        self._update_min_free_bytes()
+        self.logger.info("Settings path: %s", self.config.settings_path)
+        self.logger.info("Settings: %s", self.settings)
+        # Service URLs are derived from the BlueOS address once, here
+        self.mavlink_url = f"ws://{config.blueos_address}/mavlink2rest/ws/mavlink?filter=HEARTBEAT"
+        self._cam_mgr_url = f"http://{config.blueos_address}/mavlink-camera-manager/streams"
+        self._http_session: Optional[aiohttp.ClientSession] = None
+        self._streams_cache_ts = float("-inf")  # Monotonic time of the last camera manager fetch
+        self.recording_processes: Dict[str, asyncio.subprocess.Process] = {}
         self.is_armed = False
         self.ws = None
+        # Raw heartbeat frames handed from the websocket reader to _heartbeat_worker
+        self._heartbeat_q: asyncio.Queue = asyncio.Queue(maxsize=HEARTBEAT_QUEUE_SIZE)
+        self._index_template = self.load_index_template()
+        self._index_etag: Optional[str] = None  # Derived from the template contents on first request
+        self._disk_cache = (0.0, None)  # (monotonic timestamp, DiskUsage)
+        self._video_heap: Optional[List[Tuple[float, str]]] = None  # (mtime, path) min-heap, built lazily
+        self._disk_below_min = False  # Maintained by _housekeeper, checked when arming
+        self._reclaim_blocked_free: Optional[int] = None  # Free bytes when reclaiming last gave up, None when allowed
+        self._discovered_urls = set()  # RTSP URLs already probed with gst-discoverer
+        self._pending_verify: Dict[str, Tuple[str, asyncio.subprocess.Process, float]] = {}  # name -> (file, process, deadline)
+        self._verify_task: Optional[asyncio.Task] = None
+        # The event loop only keeps weak references to tasks, so fire-and-forget ones are held here until done
+        self._background_tasks = set()
         self.app = web.Application()
         self.setup_routes()
 
     def load_settings(self) -> dict:
-        settings_path = Path(self.settings_path)
+        settings_path = Path(self.config.settings_path)
         if settings_path.exists():
-            with open(settings_path) as f:
-                return json.load(f)
+            return orjson.loads(settings_path.read_bytes())
         # Create settings directory if it doesn't exist
         settings_path.parent.mkdir(parents=True, exist_ok=True)
         return {
@@ -70,15 +252,82 @@ class VideoRecorder:
                 "video_folder": "/home/blueos/videos",
                 "minimum_free_space_mb": 1024,
                 "out_of_space_action": "delete_oldest_video",
-                "segment_size": 500  # Size in MB for video segments
+                "segment_size": 500,  # Size in MB for video segments
+                "recording_mode": DEFAULT_RECORDING_MODE
             }
         }
 
-    def save_settings(self):
-        settings_path = Path(self.settings_path)
-        with open(settings_path, 'w') as f:
-            json.dump(self.settings, f, indent=4)
+    async def _read_file(self, path: str) -> str:
+        """Read a text file in a worker thread so slow storage doesn't stall the event loop"""
+        return await asyncio.to_thread(Path(path).read_text)
+
+    def load_index_template(self) -> Optional[bytes]:
+        """Read the index page once at startup; handle_index retries if this fails"""
+        try:
+            # Kept as encoded bytes so each response is served without re-encoding
+            return Path("views/index.html").read_bytes()
+        except OSError as e:
+            self.logger.warning("Could not read index template: %s", e)
+            return None
+
+    async def save_settings(self):
+        """Mark settings as changed and schedule a debounced write to disk"""
+        self._settings_dirty = True
+        # A new minimum, action or set of enabled streams may change the outcome, let the housekeeper try again
+        self._reclaim_blocked_free = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._debounced_flush())
+
+    async def _debounced_flush(self):
+        """Wait for further changes to settle, then write settings once"""
+        await asyncio.sleep(SETTINGS_FLUSH_DELAY)
+        # Changes made while a write was in flight found this task still running and didn't
+        # schedule another one, so keep flushing until nothing is left
+        while self._settings_dirty:
+            if not await self.flush_settings():
+                # Left dirty, the next save or the shutdown flush tries again
+                break
+
+    async def flush_settings(self) -> bool:
+        """Write settings to disk now if they changed since the last write, returning False if the write failed"""
+        async with self._settings_lock:
+            if not self._settings_dirty:
+                return True
+            # Serialize on the event loop so the snapshot is consistent, write in a thread
+            try:
+                data = orjson.dumps(self.settings)
+            except TypeError as e:
+                # A value orjson can't encode; leave the change pending rather than dropping it unlogged
+                self.logger.error("Error saving settings: %s", e)
+                return False
+            self._settings_dirty = False
+            if data == self._last_settings_bytes:
+                return True
+            try:
+                await asyncio.to_thread(self._write_settings_file, data)
+            except OSError as e:
+                # e.g. ENOSPC on a full card; keep the change pending so it isn't silently dropped
+                self.logger.error("Error saving settings: %s", e)
+                self._settings_dirty = True
+                return False
+            self._last_settings_bytes = data
         self.logger.info("Settings saved.")
+        return True
+
+    def _write_settings_file(self, data: bytes):
+        """Write settings atomically so a power loss never leaves a truncated file"""
+        settings_path = Path(self.config.settings_path)
+        tmp_path = settings_path.with_suffix(".json.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            # Make sure the data is on disk before the rename makes it the live settings file
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp_path, settings_path)
 
     def setup_routes(self):
         self.app.router.add_get('/', self.handle_index)
@@ -93,121 +342,185 @@ class VideoRecorder:
         static_dir = Path('static')
         self.app.router.add_static('/static', str(static_dir))
 
+    async def _ensure_http(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use inside the event loop"""
+        if self._http_session is None or self._http_session.closed:
+            self._http_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, limit_per_host=8, keepalive_timeout=60)
+            )
+        return self._http_session
+
     async def fetch_camera_streams(self) -> List[dict]:
         """Fetch available streams from MAVLink camera manager"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"http://{self.mavlink_url.split('://')[1].split('/')[0]}/mavlink-camera-manager/streams") as response:
-                    if response.status == 200:
-                        streams = await response.json()
-                        new_streams = []
-                        for stream in streams:
-                            url = stream["video_and_stream"]["stream_information"]["endpoints"][0]
-                            if "rtsp" in url.lower():
-                                new_streams.append({
-                                    "name": stream["video_and_stream"]["name"],
-                                    "url": url.replace("rtspu://", "rtsp://").replace("rtspt://", "rtsp://").replace("rtsph://", "rtsp://").replace("0.0.0.0", "blueos.internal"),
-                                    "enabled": True
-                                })
-                        return new_streams
-  
-                    else:
-                        self.logger.error(f"Failed to fetch streams: {response.status}")
-                        return []
+            session = await self._ensure_http()
+            async with session.get(self._cam_mgr_url) as response:
+                if response.status == 200:
+                    streams = await response.json(loads=orjson.loads)
+                    new_streams = []
+                    for stream in streams:
+                        url = stream["video_and_stream"]["stream_information"]["endpoints"][0]
+                        if "rtsp" in url.lower():
+                            new_streams.append({
+                                "name": stream["video_and_stream"]["name"],
+                                "url": _RTSP_VARIANT_RE.sub("rtsp://", url).replace("0.0.0.0", "blueos.internal"),
+                                "enabled": True
+                            })
+                    return new_streams
+
+                else:
+                    self.logger.error("Failed to fetch streams: %s", response.status)
+                    return []
         except Exception as e:
-            self.logger.error(f"Error fetching streams: {e}")
+            self.logger.error("Error fetching streams: %s", e)
             return []
 
     async def update_streams_from_camera_manager(self):
         """Update settings with streams from camera manager"""
+        # Page loads and settings polls arrive in bursts, only ask the camera manager once per TTL
+        if time.monotonic() - self._streams_cache_ts < STREAMS_CACHE_TTL:
+            return
+        self._streams_cache_ts = time.monotonic()
         camera_streams = await self.fetch_camera_streams()
         
         # Update existing streams and add new ones
-        existing_names = {stream["name"] for stream in self.settings["streams"]}
+        existing_streams = {stream["name"]: stream for stream in self.settings["streams"]}
+        changed = False
         
         for stream in camera_streams:
-            if stream["name"] not in existing_names:
+            existing_stream = existing_streams.get(stream["name"])
+            if existing_stream is None:
                 self.settings["streams"].append(stream)
-                self.logger.info(f"Added new stream: {stream['name']}")
-            else:
+                existing_streams[stream["name"]] = stream
+                changed = True
+                self.logger.info("Added new stream: %s", stream['name'])
+            elif existing_stream.get("url") != stream["url"]:
                 # Update URL of existing stream but preserve enabled state
-                for existing_stream in self.settings["streams"]:
-                    if existing_stream["name"] == stream["name"]:
-                        existing_stream["url"] = stream["url"]
-                        break
+                existing_stream["url"] = stream["url"]
+                changed = True
         
-        self.save_settings()
+        if changed:
+            await self.save_settings()
 
     async def handle_update_settings(self, request):
         data = await request.post()
         # data should always be the full settings object
         self.settings = data
-        self.save_settings()
+        await self.save_settings()
         
         # Redirect back to main page
         return web.Response(status=302, headers={'Location': '/'})
 
     async def handle_delete_oldest(self, request=None):
         """Manually trigger deletion of oldest video file"""
-        video_folder = Path(self.settings["settings"]["video_folder"])
-        video_files = list(video_folder.glob("*.mp4"))
+        oldest_video = await self._delete_oldest_video()
         message = ""
-        if video_files:
-            oldest_video = min(video_files, key=lambda x: x.stat().st_mtime)
-            self.logger.info(f"Deleting oldest video: {oldest_video}")
-            oldest_video.unlink()
+        if oldest_video:
             message = f"deleted oldest video: {oldest_video}"
         else:
             message = "no videos to delete"
         # Redirect back to main page
-        return web.Response(status=302, headers={'Location': f'/?message={message}'})
+        # Percent-encode so paths containing '&', '#' or spaces survive the query string
+        return web.Response(status=302, headers={'Location': f'/?message={quote(message)}'})
 
-    async def handle_disk_space(self, request):
-        """Return disk space information as JSON"""
+    def _iter_files(self, folder: Path, suffix):
+        """Yield DirEntry objects for regular files in folder ending with suffix (a str or tuple of str)"""
+        # scandir entries cache their stat result, avoiding a Path object and repeated stat(2) calls
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.name.endswith(suffix) and entry.is_file(follow_symlinks=False):
+                    yield entry
+
+    def _scan_mtimes(self, folder: Path, suffix: str) -> List[Tuple[float, str]]:
+        """List (mtime, path) for files in folder ending with suffix, with one stat per file"""
+        return [(entry.stat(follow_symlinks=False).st_mtime, entry.path)
+                for entry in self._iter_files(folder, suffix)]
+
+    def _scan_videos(self) -> List[Tuple[float, str]]:
+        """Build a min-heap of (mtime, path) for every video in the video folder"""
+        heap = self._scan_mtimes(self._video_folder, ".mp4")
+        heapq.heapify(heap)
+        return heap
+
+    async def _delete_oldest_video(self) -> Optional[str]:
+        """Delete the oldest video file, returning its path or None if there was nothing to delete"""
+        oldest_video = await self._pop_oldest_video()
+        if oldest_video:
+            self.logger.info("Deleting oldest video: %s", oldest_video)
+            # Unlinking a large file can take a while on an SD card
+            await asyncio.to_thread(os.unlink, oldest_video)
+            self._invalidate_disk_usage()
+        return oldest_video
+
+    async def _pop_oldest_video(self) -> Optional[str]:
+        """Pop the oldest video that still exists, rescanning the folder only when the heap is stale"""
+        fresh = self._video_heap is None
+        while True:
+            if self._video_heap is None:
+                # A full folder scan stats every video, keep it off the event loop
+                self._video_heap = await asyncio.to_thread(self._scan_videos)
+            while self._video_heap:
+                _, path = heapq.heappop(self._video_heap)
+                if os.path.exists(path):
+                    return path
+            if fresh:
+                return None
+            # Every cached entry was gone already; the folder may hold files the heap never saw
+            self._video_heap = None
+            fresh = True
+
+    async def _disk_space(self) -> dict:
+        """Report video folder disk space the way the API shows it, with an 'error' key on failure"""
+        minimum_free_mb = self.settings["settings"]["minimum_free_space_mb"]
         try:
-            video_folder = Path(self.settings["settings"]["video_folder"])
+            video_folder = self._video_folder
             if not video_folder.exists():
-                self.logger.warning(f"Warning: Video folder {video_folder} doesn't exist. Creating it.")
+                self.logger.warning("Warning: Video folder %s doesn't exist. Creating it.", video_folder)
                 video_folder.mkdir(parents=True, exist_ok=True)
                 
-            usage = shutil.disk_usage(video_folder)
-            
-            # Calculate free space and total space in bytes
-            free_bytes = usage.free
-            total_bytes = usage.total
-            free_mb = free_bytes // (1024 * 1024)
-            
-            response_data = {
-                'freeBytes': free_bytes,
-                'totalBytes': total_bytes,
-                'freeMb': free_mb,
-                'minimumFreeMb': self.settings["settings"]["minimum_free_space_mb"]
+            usage = await self._disk_usage_cached()
+            return {
+                'freeBytes': usage.free,
+                'totalBytes': usage.total,
+                'freeMb': usage.free // (1024 * 1024),
+                'minimumFreeMb': minimum_free_mb
             }
-            
-            return web.json_response(response_data)
-            
         except Exception as e:
-            self.logger.error(f"Error getting disk space: {e}")
-            return web.json_response({
+            self.logger.error("Error getting disk space: %s", e)
+            return {
                 'freeBytes': 0,
                 'totalBytes': 0,
                 'freeMb': 0,
-                'minimumFreeMb': self.settings["settings"]["minimum_free_space_mb"],
+                'minimumFreeMb': minimum_free_mb,
                 'error': str(e)
-            }, status=500)
+            }
+
+    async def _snapshot(self) -> dict:
+        """Collect the state shared by the status endpoints, so each request builds it once"""
+        return {
+            'is_armed': self.is_armed,
+            'active_recordings': list(self.recording_processes),
+            'disk_space': await self._disk_space(),
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def handle_disk_space(self, request):
+        """Return disk space information as JSON"""
+        disk_space = await self._disk_space()
+        return json_response(disk_space, status=500 if 'error' in disk_space else 200)
 
     async def handle_stream_status(self, request):
         """Return stream status information as JSON"""
-        return web.json_response({
+        return json_response({
             'is_armed': self.is_armed,
-            'active_recordings': list(self.recording_processes.keys()),
+            'active_recordings': list(self.recording_processes),
             'streams_configured': len(self.settings["streams"]),
             'timestamp': datetime.now().isoformat()
         })
 
     async def handle_register_service(self, request):
         """Handle BlueOS service registration"""
-        return web.json_response({
+        return json_response({
             'name': 'Dashcam',
             'description': 'Video recording extension for BlueOS',
             'icon': 'mdi-video',
@@ -219,110 +532,127 @@ class VideoRecorder:
 
     async def handle_dashcam_data(self, request):
         """Return all dashcam data as JSON"""
-        # Check disk space
-        try:
-            video_folder = Path(self.settings["settings"]["video_folder"])
-            if not video_folder.exists():
-                video_folder.mkdir(parents=True, exist_ok=True)
-                
-            usage = shutil.disk_usage(video_folder)
-            free_bytes = usage.free
-            total_bytes = usage.total
-            free_mb = free_bytes // (1024 * 1024)
-            
-            disk_space = {
-                'freeBytes': free_bytes,
-                'totalBytes': total_bytes,
-                'freeMb': free_mb,
-                'minimumFreeMb': self.settings["settings"]["minimum_free_space_mb"]
-            }
-        except Exception as e:
-            self.logger.error(f"Error getting disk space: {e}")
-            disk_space = {
-                'freeBytes': 0,
-                'totalBytes': 0,
-                'freeMb': 0,
-                'minimumFreeMb': self.settings["settings"]["minimum_free_space_mb"],
-                'error': str(e)
-            }
+        snapshot = await self._snapshot()
         
         # Compile all data
         response_data = {
-            'is_armed': self.is_armed,
-            'active_recordings': list(self.recording_processes.keys()),
+            'is_armed': snapshot['is_armed'],
+            'active_recordings': snapshot['active_recordings'],
             'streams': self.settings["streams"],
             'settings': self.settings["settings"],
-            'disk_space': disk_space,
-            'timestamp': datetime.now().isoformat()
+            'disk_space': snapshot['disk_space'],
+            'timestamp': snapshot['timestamp']
         }
         
-        return web.json_response(response_data)
+        return json_response(response_data)
 
     async def handle_index(self, request):
         # Update streams from camera manager before serving the page
         await self.update_streams_from_camera_manager()
         
         # Simply serve the HTML template without embedded data
-        template_path = Path("views/index.html")
-        with open(template_path, "r") as file:
-            template_content = file.read()
+        # The template is static and read at startup; only hit the disk if that failed
+        if self._index_template is None:
+            self._index_template = (await self._read_file("views/index.html")).encode()
+        if self._index_etag is None:
+            self._index_etag = f'"{hashlib.blake2b(self._index_template, digest_size=8).hexdigest()}"'
+        
+        # Browsers revalidate on reload, let them keep their copy instead of resending the page
+        headers = {"ETag": self._index_etag}
+        if request.headers.get("If-None-Match") == self._index_etag:
+            return web.Response(status=304, headers=headers)
         
         return web.Response(
-            text=template_content,
-            content_type="text/html"
+            body=self._index_template,
+            content_type="text/html",
+            charset="utf-8",
+            headers=headers
         )
 
-    def get_free_space_mb(self) -> int:
-        """Get free space in MB for the video folder"""
-        path = Path(self.settings["settings"]["video_folder"])
-        return shutil.disk_usage(path).free // (1024 * 1024)
+    async def _disk_usage_cached(self):
+        """Get disk usage for the video folder, reusing readings younger than DISK_USAGE_TTL"""
+        timestamp, usage = self._disk_cache
+        if usage is None or time.monotonic() - timestamp >= DISK_USAGE_TTL:
+            # statvfs can stall on a slow SD card, keep it off the event loop
+            st = await asyncio.to_thread(os.statvfs, self._video_folder)
+            usage = DiskUsage(total=st.f_blocks * st.f_frsize, free=st.f_bavail * st.f_frsize)
+            self._disk_cache = (time.monotonic(), usage)
+        return usage
+
+    def _invalidate_disk_usage(self):
+        """Force the next disk usage query to hit the filesystem, e.g. after deleting a file"""
+        self._disk_cache = (0.0, None)
+
+    def _update_min_free_bytes(self):
+        """Cache the minimum free space threshold in bytes, call whenever settings change"""
+        self._min_free_bytes = int(self.settings["settings"]["minimum_free_space_mb"]) * 1024 * 1024
+
+    async def _has_space(self) -> bool:
+        """Check whether the video folder has at least the configured minimum free space"""
+        return (await self._disk_usage_cached()).free >= self._min_free_bytes
 
     def get_latest_bin_file(self) -> Optional[str]:
         """Get the latest .bin file from the log folder"""
-        log_folder = Path(self.settings["settings"]["log_folder"])
-        bin_files = list(log_folder.glob("*.BIN"))
-        if not bin_files:
+        # Single scandir pass keeping only the newest entry, ArduPilot logs may be upper or lower case
+        latest = max(
+            ((entry.stat(follow_symlinks=False).st_mtime, entry.name)
+             for entry in self._iter_files(self._log_folder, (".BIN", ".bin"))),
+            default=None
+        )
+        if latest is None:
             return None
-        return max(bin_files, key=lambda x: x.stat().st_mtime).stem
+        return latest[1].rsplit('.', 1)[0]
 
     def get_next_video_file(self) -> Optional[str]:
         """Get the highest numbered .mp4 file from the video folder"""
-        video_folder = Path(self.settings["settings"]["video_folder"])
-        video_files = list(video_folder.glob("*.mp4"))
         max_number = 0
-        for video_file in video_files:
-            self.logger.debug(f"Checking file {video_file}")
-            filename = video_file.stem
-            self.logger.debug(f"Filename: {filename}")
+        skipped = 0
+        for entry in self._iter_files(self._video_folder, ".mp4"):
             # Extract number before first underscore
-            if '_' in filename:
-                number_part = filename.split('_')[0]
-                try:
-                    number = int(number_part)
-                    max_number = max(max_number, number)
-                except ValueError as e:
-                    self.logger.debug(f"Skipping file {filename} because {e}")
-                    continue
-        return str(max_number + 1) if max_number is not None else "0"
+            number_part, sep, _ = entry.name.partition('_')
+            # isdecimal() accepts exactly what int() parses, so no exception is raised per file
+            if sep and number_part.isdecimal():
+                number = int(number_part)
+                if number > max_number:
+                    max_number = number
+            else:
+                skipped += 1
+        if skipped and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Skipped %d video files without a numeric prefix", skipped)
+        return str(max_number + 1)
 
     def sanitize_filename(self, name: str) -> str:
         """Sanitize a string to be safe for use in filenames"""
-        # Replace problematic characters with underscores
-        # Unsafe characters: / \ : * ? " < > | and whitespace
-        unsafe_chars = r'[\\/*?:"<>|\s]'
-        sanitized = re.sub(unsafe_chars, '_', name)
-
-        # Remove leading/trailing whitespace and periods
-        sanitized = sanitized.strip('. ')
-
+        # Replace problematic characters with underscores, then strip leading/trailing periods
         # Ensure we return something if the name is empty after sanitization
-        if not sanitized:
-            sanitized = "unnamed_stream"
+        sanitized = _UNSAFE_CHARS_RE.sub('_', name).strip('. ') or "unnamed_stream"
 
-        self.logger.debug(f"Sanitized stream name '{name}' to '{sanitized}'")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Sanitized stream name '%s' to '%s'", name, sanitized)
         return sanitized
 
-    def start_recording(self, stream: dict, base_filename: str):
+    def _build_cmd(self, url: str, location: str, segment_size_bytes: int) -> Tuple[str, ...]:
+        """Build the gst-launch argv for recording url into segments matching the location pattern"""
+        mode = self.settings["settings"].get("recording_mode", DEFAULT_RECORDING_MODE)
+        encode_elements = GST_MODE_ELEMENTS.get(mode)
+        if encode_elements is None:
+            self.logger.warning("Unknown recording mode '%s', using %s", mode, DEFAULT_RECORDING_MODE)
+            encode_elements = GST_MODE_ELEMENTS[DEFAULT_RECORDING_MODE]
+        return (
+            "gst-launch-1.0",
+            "-e",  # Handle EOS gracefully
+            "rtspsrc",
+            f"location={url}",
+            "latency=0",  # Small latency for better sync
+            *GST_QUEUE_ELEMENTS,
+            *encode_elements,
+            "!",
+            "splitmuxsink",  # mp4mux segments, each one finalized and playable on its own
+            f"max-size-bytes={segment_size_bytes}",
+            f"location={location}"
+        )
+
+    async def start_recording(self, stream: dict, base_filename: str):
         """Start recording a single stream using GStreamer"""
         # Create a base filename for splitmuxsink
         timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
@@ -331,240 +661,290 @@ class VideoRecorder:
         sanitized_stream_name = self.sanitize_filename(stream['name'])
 
         base_output = f"{base_filename}_{sanitized_stream_name}_{timestamp}"
-        output_dir = Path(self.settings["settings"]["video_folder"])
-        output_pattern = str(output_dir / f"{base_output}_%02d.mp4")
+        output_dir = self._video_folder
+        # splitmuxsink treats location as a printf pattern, so a literal '%' in the folder or name must be doubled
+        output_pattern = str(output_dir / base_output).replace("%", "%%") + "_%02d.mp4"
 
         # Get segment size from settings, with fallback to 500 MB if not set
         segment_size_mb = self.settings["settings"].get("segment_size", 500)
-        segment_size_bytes = segment_size_mb * 1024 * 1024
+        segment_size_bytes = int(segment_size_mb * 1024 * 1024)  # a fractional MB setting would otherwise put a float into max-size-bytes
 
-        # Build the GStreamer pipeline command - handle both H.264 and H.265 streams
-        # Use decodebin to automatically handle different codecs
-        cmd = [
-            "gst-launch-1.0",
-            "-e",  # Handle EOS gracefully
-            "rtspsrc",
-            f"location={stream['url']}",
-            "latency=0",  # Small latency for better sync
-            "!",
-            "queue",
-            "max-size-buffers=200",  # Larger buffer for H.265
-            "max-size-time=2000000000",  # 2 second buffer for H.265
-            "max-size-bytes=20000000",  # 20MB buffer for H.265
-            "!",
-            "decodebin",  # Auto-detect and decode H.264/H.265 streams
-            "!",
-            "videoconvert",  # Ensure proper color space conversion
-            "!",
-            "videoscale",  # Handle resolution changes
-            "!",
-            "x264enc",  # Use software encoder for ARM compatibility
-            "bitrate=2000",  # Set reasonable bitrate for ARM
-            "speed-preset=ultrafast",  # Optimize for ARM performance
-            "!",
-            "h264parse",  # Parse encoded H.264
-            "!",
-            "mp4mux",  # Direct mp4 muxing
-            "faststart=true",
-            "!",
-            "filesink",
-            f"location={output_pattern.replace('_%02d', '')}"  # Single file for now
-        ]
-
-        self.logger.info(f"Starting recording for {stream['name']} to {output_pattern}")
-        self.logger.info(f"Stream URL: {stream['url']}")
-        self.logger.info(f"Segment size: {segment_size_mb} MB ({segment_size_bytes} bytes)")
-        self.logger.info(f"GStreamer command: {' '.join(cmd)}")  # Print the command for debugging
+        cmd = self._build_cmd(stream['url'], output_pattern, segment_size_bytes)
+
+        # New files are about to appear, make the next delete rescan the folder
+        self._video_heap = None
+
+        self.logger.info("Starting recording for %s to %s", stream['name'], output_pattern)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Stream URL: %s", stream['url'])
+            self.logger.debug("Segment size: %s MB (%s bytes)", segment_size_mb, segment_size_bytes)
+            self.logger.debug("GStreamer command: %s", ' '.join(cmd))
         
-        # Test RTSP connection first
-        self.logger.info(f"Testing RTSP connection to {stream['url']}...")
-        test_cmd = [
-            "gst-discoverer-1.0",
-            "--timeout=10",
-            stream['url']
-        ]
-        try:
-            test_result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=15)
-            if test_result.returncode == 0:
-                self.logger.info(f"RTSP stream discovery successful: {test_result.stdout.strip()}")
-            else:
-                self.logger.warning(f"RTSP stream discovery failed: {test_result.stderr.strip()}")
-        except subprocess.TimeoutExpired:
-            self.logger.warning("RTSP stream discovery timed out")
-        except Exception as e:
-            self.logger.warning(f"RTSP stream discovery error: {e}")
+        # Probe each RTSP URL once, in the background, purely for diagnostics
+        # The pipeline starts right away and reports connection errors itself through its output
+        if stream['url'] not in self._discovered_urls:
+            self._discovered_urls.add(stream['url'])
+            self._spawn(self._discover_stream(stream['url']))
 
         # Start subprocess with stdout and stderr capture
-        process = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,  # Merge stderr into stdout
-            universal_newlines=True,
-            bufsize=1  # Line buffered
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.DEVNULL,  # Never inherit our stdin
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT  # Merge stderr into stdout
         )
         
         # Store process and start output monitoring task
         self.recording_processes[stream["name"]] = process
         
         # Start monitoring subprocess output asynchronously
-        asyncio.create_task(self._monitor_subprocess_output(stream["name"], process))
+        self._spawn(self._monitor_subprocess_output(stream["name"], process))
         
-        # Start a task to check if the file is actually being written
-        asyncio.create_task(self._verify_recording_start(stream["name"], output_pattern.replace('_%02d', '')))
+        # Check that the first segment is actually being written
+        self._queue_verification(stream["name"], str(output_dir / f"{base_output}_00.mp4"), process)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        """Run coro as a background task that is kept alive until it finishes"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
-    async def _verify_recording_start(self, stream_name: str, output_file: str):
-        """Verify that recording has actually started and is writing data"""
+    async def _discover_stream(self, url: str):
+        """Log what gst-discoverer finds at an RTSP URL without delaying the recording"""
+        self.logger.info("Testing RTSP connection to %s...", url)
         try:
-            # Wait a bit for the file to be created
-            await asyncio.sleep(3)
-            
-            output_path = Path(output_file)
-            max_checks = 10  # Check for up to 30 seconds
-            
-            for i in range(max_checks):
-                if output_path.exists():
-                    file_size = output_path.stat().st_size
-                    if file_size > 0:
-                        self.logger.info(f"[{stream_name}] Recording verified: {output_file} ({file_size} bytes)")
-                        return
-                    else:
-                        self.logger.warning(f"[{stream_name}] File exists but is empty: {output_file}")
-                else:
-                    self.logger.warning(f"[{stream_name}] Output file not created yet: {output_file}")
-                
-                await asyncio.sleep(3)
-            
-            # If we get here, recording didn't start properly
-            self.logger.error(f"[{stream_name}] Recording failed to start properly after 30 seconds")
-            if stream_name in self.recording_processes:
-                self.stop_recording(stream_name)
-                
+            process = await asyncio.create_subprocess_exec(
+                "gst-discoverer-1.0",
+                "--timeout=10",
+                url,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=15)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                self.logger.warning("RTSP stream discovery timed out")
+                return
+            if process.returncode == 0:
+                self.logger.info("RTSP stream discovery successful: %s", stdout.decode(errors='replace').strip())
+            else:
+                self.logger.warning("RTSP stream discovery failed: %s", stderr.decode(errors='replace').strip())
         except Exception as e:
-            self.logger.error(f"Error verifying recording start for {stream_name}: {e}")
+            self.logger.warning("RTSP stream discovery error: %s", e)
+
+    def _queue_verification(self, stream_name: str, output_file: str, process: asyncio.subprocess.Process):
+        """Register a new recording with the shared verification task"""
+        self._pending_verify[stream_name] = (output_file, process, time.monotonic() + VERIFY_TIMEOUT)
+        if self._verify_task is None or self._verify_task.done():
+            self._verify_task = asyncio.create_task(self._verify_recordings())
 
-    async def _monitor_subprocess_output(self, stream_name: str, process: subprocess.Popen):
+    async def _verify_recordings(self):
+        """Verify that pending recordings have actually started and are writing data"""
+        # One task polls every pending recording, instead of one polling task per stream
+        pending = self._pending_verify
+        processes = self.recording_processes
+        while pending:
+            await asyncio.sleep(VERIFY_INTERVAL)
+            now = time.monotonic()
+            for stream_name, (output_file, process, deadline) in tuple(pending.items()):
+                try:
+                    if processes.get(stream_name) is not process:
+                        # Stopped or replaced before it could be verified
+                        del pending[stream_name]
+                        continue
+                    try:
+                        file_size = os.stat(output_file).st_size
+                    except FileNotFoundError:
+                        file_size = None
+                    if file_size:
+                        self.logger.info("[%s] Recording verified: %s (%s bytes)", stream_name, output_file, file_size)
+                        del pending[stream_name]
+                    elif now >= deadline:
+                        # Recording didn't start properly
+                        self.logger.error("[%s] Recording failed to start properly after %.0f seconds", stream_name, VERIFY_TIMEOUT)
+                        del pending[stream_name]
+                        await self.stop_recording(stream_name)
+                    elif file_size == 0:
+                        self.logger.warning("[%s] File exists but is empty: %s", stream_name, output_file)
+                    else:
+                        self.logger.warning("[%s] Output file not created yet: %s", stream_name, output_file)
+                except Exception as e:
+                    pending.pop(stream_name, None)
+                    self.logger.error("Error verifying recording start for %s: %s", stream_name, e)
+
+    async def _monitor_subprocess_output(self, stream_name: str, process: asyncio.subprocess.Process):
         """Monitor subprocess output and log it"""
+        # Runs once per GStreamer output line, so bind the lookups once up front
+        logger = self.logger
+        readline = process.stdout.readline
         try:
             while True:
-                line = process.stdout.readline()
+                try:
+                    line = await readline()
+                except ValueError:
+                    # Line longer than the stream buffer limit; asyncio has discarded it,
+                    # keep monitoring instead of dropping a still-running pipeline
+                    logger.warning("[%s] Skipped overlong GStreamer output line", stream_name)
+                    continue
                 if not line:
                     break
                 
                 # Log the GStreamer output with stream name prefix
-                line = line.strip()
-                if line:  # Only log non-empty lines
-                    self.logger.info(f"[{stream_name}] {line}")
+                # Lines stay bytes until we know they will be emitted
+                if logger.isEnabledFor(logging.INFO):
+                    line = line.strip()
+                    if line:  # Only log non-empty lines
+                        logger.info("[%s] %s", stream_name, line.decode(errors="replace"))
                     
         except Exception as e:
-            self.logger.error(f"Error monitoring output for {stream_name}: {e}")
+            self.logger.error("Error monitoring output for %s: %s", stream_name, e)
         finally:
-            # Ensure process is cleaned up
-            if stream_name in self.recording_processes:
+            # Ensure process is cleaned up, unless a new recording already took its place
+            if self.recording_processes.get(stream_name) is process:
                 del self.recording_processes[stream_name]
 
-    def stop_recording(self, stream_name: str):
+    async def stop_recording(self, stream_name: str):
         """Stop recording a single stream"""
         if stream_name in self.recording_processes:
-            self.logger.info(f"Stopping recording for {stream_name}")
+            self.logger.info("Stopping recording for %s", stream_name)
             process = self.recording_processes[stream_name]
             
             # Send SIGINT instead of SIGTERM for a more graceful shutdown
             # SIGINT allows GStreamer to handle EOS and finalize the file properly
-            process.send_signal(signal.SIGINT)
+            if process.returncode is None:
+                try:
+                    process.send_signal(signal.SIGINT)
+                except ProcessLookupError:
+                    pass
             
-            # Give GStreamer some time to properly finalize the file
+            # Give GStreamer some time to properly finalize the file without blocking the event loop
             try:
-                process.wait(timeout=5)  # Wait up to 5 seconds for proper shutdown
-            except subprocess.TimeoutExpired:
-                self.logger.warning(f"GStreamer process for {stream_name} did not exit gracefully, forcing termination")
-                process.terminate()
-                process.wait()
-            
-            # Close stdout to signal the monitoring task to stop
-            if process.stdout:
-                process.stdout.close()
+                await asyncio.wait_for(process.wait(), timeout=5)  # Wait up to 5 seconds for proper shutdown
+            except asyncio.TimeoutError:
+                self.logger.warning("GStreamer process for %s did not exit gracefully, forcing termination", stream_name)
+                process.kill()
+                await process.wait()
                 
-            # The monitoring task will clean up the process from recording_processes
+            # The monitoring task sees EOF on stdout and cleans up the process from recording_processes
 
     async def handle_space_issue(self):
-        """Handle out of space situation"""
-        action = self.settings["settings"]["out_of_space_action"]
-        if action == "stop":
-            for stream_name in list(self.recording_processes.keys()):
-                self.stop_recording(stream_name)
-        elif action == "delete_oldest_video":
-            await self.handle_delete_oldest()
+        """Delete oldest videos until the minimum free space is met, at most a bounded number per pass"""
+        free_before = (await self._disk_usage_cached()).free
+        for _ in range(MAX_RECLAIM_DELETIONS):
+            if self.is_armed or self.recording_processes:
+                # Armed while deleting, leave the new segments alone
+                return
+            if not await self._delete_oldest_video():
+                break
+            if await self._has_space():
+                return
+        free = (await self._disk_usage_cached()).free
+        if free > free_before:
+            # Still short but getting there, the next pass carries on
+            return
+        self.logger.error("Failed to handle space issue! %d MB free, below the %d MB minimum",
+                          free // (1024 * 1024), self._min_free_bytes // (1024 * 1024))
+        # Deleting made no progress, so don't retry on every pass; wait until space frees up some other way or settings change
+        self._reclaim_blocked_free = free
+
+    async def _should_reclaim(self) -> bool:
+        """Whether old videos should be deleted now to make room for the next recording"""
+        # Only reclaim while disarmed and once every recording has exited; is_armed drops before
+        # stop_recording finishes, and segments may still be finalizing until EOS
+        if self.is_armed or self.recording_processes:
+            return False
+        if self.settings["settings"]["out_of_space_action"] != "delete_oldest_video":
+            return False
+        # Only make room when something would actually record into it
+        if not any(stream.get("enabled", False) for stream in self.settings["streams"]):
+            return False
+        usage = await self._disk_usage_cached()
+        if usage.free >= self._min_free_bytes:
+            return False
+        return self._reclaim_blocked_free is None or usage.free > self._reclaim_blocked_free
+
+    async def _housekeeper(self):
+        """Keep the free space flag current and reclaim space while disarmed"""
+        while True:
+            try:
+                if await self._should_reclaim():
+                    await self.handle_space_issue()
+                below_min = not await self._has_space()
+                if below_min != self._disk_below_min:
+                    if below_min:
+                        self.logger.error("Free space is below the configured minimum, recordings will not start")
+                    else:
+                        self.logger.info("Free space is back above the configured minimum")
+                        self._reclaim_blocked_free = None
+                    self._disk_below_min = below_min
+            except Exception as e:
+                self.logger.error("Error handling space issue: %s", e)
+            await asyncio.sleep(HOUSEKEEPING_INTERVAL)
 
     async def process_heartbeat(self, message: dict):
         """Process MAVLink heartbeat message"""
         # Skip messages that aren't HEARTBEAT
-        if message.get("message", {}).get("type") != "HEARTBEAT":
+        msg = message.get("message") or _EMPTY
+        if msg.get("type") != "HEARTBEAT":
+            return
+        
+        # mavlink2rest always sends these fields, so index directly and treat a miss as malformed
+        try:
+            autopilot_type = msg["autopilot"]["type"]
+            mavtype = msg["mavtype"]["type"]
+            base_mode = msg["base_mode"]["bits"]
+        except (KeyError, TypeError):
+            self.logger.debug("Ignoring malformed heartbeat: %s", msg)
             return
         
         # Skip messages from non-autopilot components (e.g. onboard controllers, cameras)
         # Valid autopilots have non-zero values different from MAV_AUTOPILOT_INVALID
-        autopilot_type = message.get("message", {}).get("autopilot", {}).get("type")
-        valid_autopilots = [
-            "MAV_AUTOPILOT_GENERIC", 
-            "MAV_AUTOPILOT_ARDUPILOTMEGA",
-            "MAV_AUTOPILOT_PX4"
-        ]
-        if autopilot_type not in valid_autopilots:
-            self.logger.debug(f"Ignoring message from non-autopilot component: {autopilot_type}")
+        if autopilot_type not in VALID_AUTOPILOTS:
+            self.logger.debug("Ignoring message from non-autopilot component: %s", autopilot_type)
             return
         
         # Skip messages from non-vehicle types (like cameras, gimbals, etc.)
-        mavtype = message.get("message", {}).get("mavtype", {}).get("type")
-        vehicle_types = [
-            "MAV_TYPE_FIXED_WING", 
-            "MAV_TYPE_QUADROTOR", 
-            "MAV_TYPE_HELICOPTER", 
-            "MAV_TYPE_GROUND_ROVER", 
-            "MAV_TYPE_SUBMARINE",
-            "MAV_TYPE_SURFACE_BOAT",
-            "MAV_TYPE_VTOL"
-        ]
-        if mavtype not in vehicle_types:
-            self.logger.warning(f"Ignoring message from non-vehicle component: {mavtype}")
+        if mavtype not in VEHICLE_TYPES:
+            self.logger.warning("Ignoring message from non-vehicle component: %s", mavtype)
             return
 
-        # Extract base_mode from the message
-        base_mode = message.get("message", {}).get("base_mode", {}).get("bits", 0)
-        self.logger.debug(f"Base mode bits: {base_mode}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Base mode bits: %s", base_mode)
         
         # Check if the vehicle is armed (bit 7 is set)
         is_armed = bool(base_mode & 0x80)
-        self.logger.debug(f"Vehicle armed: {is_armed}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("Vehicle armed: %s", is_armed)
         
         if is_armed and not self.is_armed:
             # Vehicle just armed
             self.logger.info("Vehicle just armed, starting recordings...")
             self.is_armed = True
-            base_filename = self.get_latest_bin_file()
+            # Both lookups scan a whole folder, run them in a thread so heartbeats keep flowing
+            base_filename = await asyncio.to_thread(self.get_latest_bin_file)
             if not base_filename:
                 self.logger.info("No latest bin file found, using next video file")
-                base_filename = self.get_next_video_file()
-            self.logger.info(f"base filename: {base_filename}")
+                base_filename = await asyncio.to_thread(self.get_next_video_file)
+            self.logger.info("base filename: %s", base_filename)
             if base_filename:
-                for stream in self.settings["streams"]:
-                    # Only record enabled streams
-                    if stream.get("enabled", False):
-                        count = 0
-                        while self.get_free_space_mb() < self.settings["settings"]["minimum_free_space_mb"]:
-                            count += 1
-                            if count > 10:
-                                self.logger.error("Failed to handle space issue!")
-                                break
-                            try:
-                                await self.handle_space_issue()
-                            except Exception as e:
-                                self.logger.error(f"Error handling space issue: {e}")
-                                break
-                        if self.get_free_space_mb() >= self.settings["settings"]["minimum_free_space_mb"]:
-                            self.logger.info(f"Starting recording for {stream['name']} with base filename: {base_filename}")
-                            self.start_recording(stream, base_filename)
-                    else:
-                        self.logger.info(f"Skipping disabled stream: {stream['name']}")
+                # The housekeeper has already tried to reclaim space, don't wait on disk cleanup here
+                if self._disk_below_min:
+                    self.logger.error("Not enough free space, no recordings started")
+                else:
+                    streams_to_start = []
+                    for stream in self.settings["streams"]:
+                        # Only record enabled streams
+                        if stream.get("enabled", False):
+                            self.logger.info("Starting recording for %s with base filename: %s", stream['name'], base_filename)
+                            streams_to_start.append(stream)
+                        else:
+                            self.logger.info("Skipping disabled stream: %s", stream['name'])
+                    # Spawn all pipelines concurrently rather than one after another
+                    await asyncio.gather(*(self.start_recording(stream, base_filename) for stream in streams_to_start))
             else:
                 self.logger.info("No .bin files found in log folder")
         
@@ -572,74 +952,85 @@ class VideoRecorder:
             # Vehicle just disarmed
             self.logger.info("Vehicle just disarmed, stopping recordings...")
             self.is_armed = False
-            for stream_name in list(self.recording_processes.keys()):
-                self.stop_recording(stream_name)
+            await asyncio.gather(*(self.stop_recording(name) for name in tuple(self.recording_processes)))
 
     async def connect_websocket(self):
         """Connect to MAVLink2Rest websocket"""
+        delay = 1.0
         while True:
             try:
-                self.logger.info(f"Connecting to WebSocket at {self.mavlink_url}")
-                async with websockets.connect(self.mavlink_url) as websocket:
+                self.logger.info("Connecting to WebSocket at %s", self.mavlink_url)
+                # Pings detect dead connections; max_size caps memory for unexpected large frames
+                # Heartbeat frames are tiny, so per-message deflate would only cost CPU
+                async with websockets.connect(
+                    self.mavlink_url,
+                    ping_interval=20,
+                    ping_timeout=20,
+                    max_size=1 << 20,
+                    compression=None
+                ) as websocket:
                     self.ws = websocket
                     self.logger.info("WebSocket connected successfully")
                     async for message in websocket:
-                        await self.process_heartbeat(json.loads(message))
+                        # Connection is healthy once data flows, restart the backoff
+                        delay = 1.0
+                        # Cheap substring check so non-heartbeat frames are never parsed
+                        if '"HEARTBEAT"' not in message:
+                            continue
+                        # Hand off so slow arming work (disk cleanup, process start) never stalls the socket
+                        if self._heartbeat_q.full():
+                            self._heartbeat_q.get_nowait()
+                        self._heartbeat_q.put_nowait(message)
             except Exception as e:
-                self.logger.error(f"WebSocket error: {e}")
-                await asyncio.sleep(1)  # Wait before reconnecting
+                self.logger.error("WebSocket error: %s", e)
+                # Exponential backoff with jitter so a down mavlink2rest isn't hammered
+                await asyncio.sleep(delay * (0.5 + random.random()))
+                delay = min(delay * 2, WS_RECONNECT_MAX_DELAY)
+
+    async def _heartbeat_worker(self):
+        """Process heartbeats queued by connect_websocket, one at a time and in order"""
+        while True:
+            message = await self._heartbeat_q.get()
+            try:
+                await self.process_heartbeat(orjson.loads(message))
+            except Exception as e:
+                self.logger.error("Error processing heartbeat: %s", e)
 
     async def run(self):
         """Main run loop"""
-        self.logger.info(f"Starting Dashcam service...")
-        self.logger.info(f"Settings path: {self.settings_path}")
+        self.logger.info("Starting Dashcam service...")
+        self.logger.info("Settings path: %s", self.config.settings_path)
         # Create necessary directories
-        os.makedirs(self.settings["settings"]["log_folder"], exist_ok=True)
-        os.makedirs(self.settings["settings"]["video_folder"], exist_ok=True)
+        # Blocking calls are fine here, the web server is not accepting requests yet
+        os.makedirs(self._log_folder, exist_ok=True)
+        os.makedirs(self._video_folder, exist_ok=True)
 
         # Start the web server and WebSocket connection concurrently
-        runner = web.AppRunner(self.app)
+        # No access log, formatting a line per API poll costs more than serving the request
+        runner = web.AppRunner(self.app, access_log=None)
         await runner.setup()
+        await self._ensure_http()
         site = web.TCPSite(runner, '0.0.0.0', 8080)
         
         try:
             await asyncio.gather(
                 site.start(),
-                self.connect_websocket()
+                self.connect_websocket(),
+                self._heartbeat_worker(),
+                self._housekeeper()
             )
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            # asyncio.run() delivers Ctrl-C by cancelling the main task, so both have to be handled here
             self.logger.info("Shutting down gracefully...")
             # Stop all active recordings
-            for stream_name in list(self.recording_processes.keys()):
-                self.stop_recording(stream_name)
+            await asyncio.gather(*(self.stop_recording(name) for name in tuple(self.recording_processes)))
+            await self.flush_settings()
+            await self._http_session.close()
             await runner.cleanup()
 
     async def handle_status_api(self, request):
         """Return current system status as JSON"""
-        # Get disk space info
-        try:
-            video_folder = Path(self.settings["settings"]["video_folder"])
-            if not video_folder.exists():
-                video_folder.mkdir(parents=True, exist_ok=True)
-                
-            usage = shutil.disk_usage(video_folder)
-            free_bytes = usage.free
-            total_bytes = usage.total
-            free_mb = free_bytes // (1024 * 1024)
-            
-            disk_space = {
-                'freeBytes': free_bytes,
-                'totalBytes': total_bytes,
-                'freeMb': free_mb
-            }
-        except Exception as e:
-            self.logger.error(f"Error getting disk space: {e}")
-            disk_space = {
-                'freeBytes': 0,
-                'totalBytes': 0,
-                'freeMb': 0,
-                'error': str(e)
-            }
+        snapshot = await self._snapshot()
         
         # Compile and return status information
         response_data = {
@@ -650,17 +1041,17 @@ class VideoRecorder:
             },
             # Vehicle and recording status
             'vehicle': {
-                'is_armed': self.is_armed
+                'is_armed': snapshot['is_armed']
             },
             'recordings': {
-                'active': list(self.recording_processes.keys())
+                'active': snapshot['active_recordings']
             },
             # Current disk space
-            'disk_space': disk_space,
-            'timestamp': datetime.now().isoformat()
+            'disk_space': snapshot['disk_space'],
+            'timestamp': snapshot['timestamp']
         }
 
-        return web.json_response(response_data)
+        return json_response(response_data)
 
     async def handle_settings_api(self, request):
         """Return current settings as JSON"""
@@ -672,68 +1063,103 @@ class VideoRecorder:
             'general': {
                 'minimum_free_space_mb': self.settings["settings"]["minimum_free_space_mb"],
                 'out_of_space_action': self.settings["settings"]["out_of_space_action"],
-                'segment_size': self.settings["settings"].get("segment_size", 500)
+                'segment_size': self.settings["settings"].get("segment_size", 500),
+                'recording_mode': self.settings["settings"].get("recording_mode", DEFAULT_RECORDING_MODE)
             },
             'streams': self.settings["streams"]
         }
 
-        return web.json_response(response_data)
+        return json_response(response_data)
+
+    def _is_unchanged(self, data: dict) -> bool:
+        """Check whether applying an update payload would leave the settings exactly as they are"""
+        general = data.get("general")
+        if isinstance(general, dict):
+            current = self.settings["settings"]
+            for key, value in general.items():
+                if key not in READ_ONLY_SETTINGS and (key not in current or current[key] != value):
+                    return False
+        streams = data.get("streams")
+        return not isinstance(streams, list) or streams == self.settings["streams"]
+
+    def _apply_enabled_toggles(self, streams) -> bool:
+        """Apply enabled flags in place if that is the only difference from the current streams"""
+        current = self.settings["streams"]
+        if not isinstance(streams, list) or len(streams) != len(current):
+            return False
+        for new, old in zip(streams, current):
+            if new.keys() - {"enabled"} != old.keys() - {"enabled"}:
+                return False
+            for key, value in new.items():
+                if key != "enabled" and old[key] != value:
+                    return False
+        for new, old in zip(streams, current):
+            old["enabled"] = new.get("enabled", True)
+        return True
 
     async def handle_settings_update(self, request):
         """Update settings from API request"""
         try:
             # Get JSON data from request
-            data = await request.json()
+            data = orjson.loads(await request.read())
             
-            # Basic validation
-            if not isinstance(data, dict):
-                return web.json_response({
+            # Validate the whole payload up front so an invalid update changes nothing
+            error = validate_settings_payload(data)
+            if error:
+                return json_response({
                     "success": False,
-                    "message": "Invalid request format: body must be a JSON object"
+                    "message": f"Invalid request format: {error}"
                 }, status=400)
             
+            # The UI re-posts everything on save, skip all work when nothing actually changed
+            if self._is_unchanged(data):
+                return json_body_response(SETTINGS_UPDATED_BODY)
+            
+            # Stream toggles from the UI only flip enabled flags, apply those in place
+            if "general" not in data and self._apply_enabled_toggles(data.get("streams")):
+                await self.save_settings()
+                return json_body_response(SETTINGS_UPDATED_BODY)
+            
             # Update general settings
             if "general" in data and isinstance(data["general"], dict):
                 for key, value in data["general"].items():
                     # Skip read-only settings
-                    if key not in ["log_folder", "video_folder"]:
+                    if key not in READ_ONLY_SETTINGS:
                         self.settings["settings"][key] = value
+                self._update_min_free_bytes()
             
             # Update streams
             if "streams" in data and isinstance(data["streams"], list):
-                # Get current active recordings to check if we need to stop any
-                current_stream_names = {stream["name"] for stream in self.settings["streams"]}
-                new_stream_names = {stream["name"] for stream in data["streams"] if "name" in stream}
+                # One pass collects the new URLs by name and ensures every stream has an enabled field
+                # Every stream is known to have a name, validate_settings_payload checked it
+                new_urls = {}
+                for stream in data["streams"]:
+                    new_urls[stream["name"]] = stream.get("url")
+                    stream.setdefault("enabled", True)
                 
-                # Stop recordings for streams that are being removed
-                for stream_name in current_stream_names - new_stream_names:
-                    if stream_name in self.recording_processes:
-                        self.stop_recording(stream_name)
+                # Stop recordings for streams that are removed or now point at a different URL,
+                # all at once so the waits overlap; a changed stream picks up its new URL on the next arm
+                # Only active recordings can need stopping, so diff against those instead of every configured stream
+                old_urls = {stream["name"]: stream.get("url") for stream in self.settings["streams"]}
+                await asyncio.gather(
+                    *(self.stop_recording(stream_name) for stream_name in tuple(self.recording_processes)
+                      if stream_name not in new_urls or new_urls[stream_name] != old_urls.get(stream_name)),
+                    return_exceptions=True
+                )
                 
                 # Replace the entire streams array
                 self.settings["streams"] = data["streams"]
-                
-                # Ensure all streams have an enabled field
-                for stream in self.settings["streams"]:
-                    if "enabled" not in stream:
-                        stream["enabled"] = True
             
             # Save settings to file
-            self.save_settings()
+            await self.save_settings()
             
-            return web.json_response({
-                "success": True,
-                "message": "Settings updated successfully"
-            })
+            return json_body_response(SETTINGS_UPDATED_BODY)
             
-        except json.JSONDecodeError:
-            return web.json_response({
-                "success": False,
-                "message": "Invalid JSON data"
-            }, status=400)
+        except orjson.JSONDecodeError:
+            return json_body_response(INVALID_JSON_BODY, status=400)
         except Exception as e:
-            self.logger.error(f"Error updating settings: {e}")
-            return web.json_response({
+            self.logger.error("Error updating settings: %s", e)
+            return json_response({
                 "success": False,
                 "message": f"Error updating settings: {str(e)}"
             }, status=500)
@@ -753,42 +1179,57 @@ async def main():
     log_dir = Path(args.video_folder).parent / "logs"
     log_dir.mkdir(parents=True, exist_ok=True)
     log_file = log_dir / "dashcam.log"
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
     
-    # Create file handler for logging to file
-    file_handler = logging.FileHandler(log_file)
+    # Create file handler for logging to file, rotated so a long deployment can't fill the disk
+    file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=10 * 1024 * 1024, backupCount=3)
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    file_handler.setFormatter(formatter)
     
     # Create console handler for stdout
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    console_handler.setFormatter(formatter)
     
     # Configure root logger
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        force=True,
-        handlers=[file_handler, console_handler]
-    )
+    # Records are only queued on the event loop, a listener thread does the actual file and console writes
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    root_logger = logging.getLogger()
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    root_logger.setLevel(logging.INFO)
+    listener.start()
     logger = logging.getLogger("dashcam")
 
     # Ensure directories exist
-    for directory in [args.log_folder, args.video_folder]:
-        if not os.path.exists(directory):
-            logger.info(f"Creating directory: {directory}")
-            os.makedirs(directory, exist_ok=True)
-
-    # Construct MAVLink URL from blueos address
-    mavlink_url = f"ws://{args.blueos_address}/mavlink2rest/ws/mavlink?filter=HEARTBEAT"
+    for directory in (args.log_folder, args.video_folder):
+        # Let makedirs do the existence check instead of a separate stat beforehand
+        try:
+            os.makedirs(directory)
+        except FileExistsError:
+            continue
+        logger.info("Created directory: %s", directory)
 
-    recorder = VideoRecorder(args.log_folder, args.video_folder, mavlink_url, args.settings_path)
+    config = DashcamConfig(
+        log_folder=args.log_folder,
+        video_folder=args.video_folder,
+        blueos_address=args.blueos_address,
+        settings_path=args.settings_path
+    )
+    recorder = VideoRecorder(config)
     try:
         await recorder.run()
     except Exception as e:
-        logger.error(f"Error: {e}")
+        logger.error("Error: %s", e)
         return 1
+    finally:
+        # Flush whatever is still queued before exiting
+        listener.stop()
     return 0
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     sys.exit(asyncio.run(main())) 
\ No newline at end of file